@@ -1,6 +1,7 @@
 import streamlit as st
 import requests
 import pandas as pd
+from requests.adapters import HTTPAdapter
 
 # Page configuration for the Streamlit web interface
 # Note: Emojis have been removed from page_icon and titles as requested
@@ -14,7 +15,21 @@ st.set_page_config(
 # This URL points to the local uvicorn server running the FastAPI application
 BASE_URL = "http://127.0.0.1:8000"
 
+# Page size requested from the paginated drill-down endpoint
+DRILLDOWN_LIMIT = 100
+
 # --- CACHING FUNCTIONS ---
+@st.cache_resource
+def get_session():
+    """
+    Creates a single HTTP session shared across all Streamlit reruns.
+    Keep-alive connection pooling avoids a new socket setup for every backend call.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    return session
+
 @st.cache_data
 def fetch_correlation_data():
     """
@@ -22,7 +37,7 @@ def fetch_correlation_data():
     Caching prevents redundant API calls and maintains UI stability during reruns.
     """
     try:
-        response = requests.get(f"{BASE_URL}/science/top-target-correlations")
+        response = get_session().get(f"{BASE_URL}/science/top-target-correlations")
         if response.status_code == 200:
             return response.json()
     except Exception:
@@ -30,6 +45,35 @@ def fetch_correlation_data():
         return None
     return None
 
+@st.cache_data(ttl=300)
+def fetch_symptom_analysis(query):
+    """
+    Fetches and caches the LLM-based symptom analysis for a sanitized query.
+    Repeated searches skip the backend round-trip (LLM call and database lookup) entirely.
+    Failed requests raise and are therefore never cached.
+    """
+    response = get_session().get(f"{BASE_URL}/analyze-symptoms", params={"query": query})
+    response.raise_for_status()
+    return response.json()
+
+@st.cache_data(ttl=300)
+def fetch_drug_effects(name):
+    """
+    Fetches and caches the known side effects for a sanitized drug name.
+    Failed requests raise and are therefore never cached.
+    """
+    response = get_session().get(f"{BASE_URL}/drug-effects", params={"name": name})
+    response.raise_for_status()
+    return response.json()
+
+def get_selected_row(selection_state):
+    """Returns the selected row index of a dataframe selection state, defaulting to the first row."""
+    if selection_state:
+        rows = selection_state["selection"]["rows"]
+        if rows:
+            return rows[0]
+    return 0
+
 # --- UI MAIN HEADER ---
 st.title("MediMatch AI Portal")
 st.markdown("### Clinical Decision Support System for Medication Side Effects")
@@ -39,6 +83,11 @@ st.sidebar.title("Navigation")
 menu = ["Home & Search", "Report Side Effect", "Scientific Analysis"]
 choice = st.sidebar.selectbox("Go to:", menu)
 
+# Cached lookups expire after a few minutes; this forces fresh results immediately
+if st.sidebar.button("Clear cache"):
+    st.cache_data.clear()
+    st.rerun()
+
 # --- SECTION 1: HOME & SEARCH (Symptom and Drug Lookups) ---
 if choice == "Home & Search":
     col1, col2 = st.columns(2)
@@ -57,30 +106,24 @@ if choice == "Home & Search":
             if symptom_query:
                 with st.spinner("Analyzing symptoms and searching database..."):
                     try:
-                        # Sending query to the FastAPI endpoint for LLM semantic mapping
-                        response = requests.get(
-                            f"{BASE_URL}/analyze-symptoms", 
-                            params={"query": symptom_query}
-                        )
+                        # Sending query to the FastAPI endpoint for LLM semantic mapping (cached per query)
+                        data = fetch_symptom_analysis(symptom_query.strip())
                         
-                        if response.status_code == 200:
-                            data = response.json()
+                        if data.get("possible_drugs"):
+                            st.markdown("---")
+                            st.subheader("Based on the description, here are drugs impacting these symptoms:")
                             
-                            if data.get("possible_drugs"):
-                                st.markdown("---")
-                                st.subheader("Based on the description, here are drugs impacting these symptoms:")
-                                
-                                for item in data["possible_drugs"]:
-                                    # String cleaning logic to handle SQL formatting artifacts
-                                    clean_drug_name = item['drug'].replace("'", "")
-                                    st.markdown(f"**Drug:** {clean_drug_name}")
-                                    st.markdown(f"**Side Effect match:** {item['side_effect']}")
-                                    st.write("") 
-                            else:
-                                st.info("No direct matches found in the database for this description.")
+                            for item in data["possible_drugs"]:
+                                # String cleaning logic to handle SQL formatting artifacts
+                                clean_drug_name = item['drug'].replace("'", "")
+                                st.markdown(f"**Drug:** {clean_drug_name}")
+                                st.markdown(f"**Side Effect match:** {item['side_effect']}")
+                                st.write("") 
                         else:
-                            st.error(f"Backend error: {response.status_code}")
+                            st.info("No direct matches found in the database for this description.")
                     
+                    except requests.exceptions.HTTPError as e:
+                        st.error(f"Backend error: {e.response.status_code}")
                     except requests.exceptions.ConnectionError:
                         st.error("Connection Error: Is the FastAPI backend running on port 8000?")
             else:
@@ -100,32 +143,27 @@ if choice == "Home & Search":
             if drug_query:
                 with st.spinner("Searching database..."):
                     try:
-                        # Direct database query via backend
-                        response = requests.get(
-                            f"{BASE_URL}/drug-effects", 
-                            params={"name": drug_query}
-                        )
+                        # Direct database query via backend (cached per drug name)
+                        data = fetch_drug_effects(drug_query.strip())
                         
-                        if response.status_code == 200:
-                            data = response.json()
-                            if data.get("side_effects"):
-                                st.markdown("---")
-                                st.markdown(f"#### Known Side Effects for: {drug_query}")
-                                
-                                # HTML/CSS badges for improved visual scannability of symptoms
-                                badges = []
-                                for se in data["side_effects"]:
-                                    badges.append(
-                                        f"<span style='background-color:#e1f5fe; color:#01579b; "
-                                        f"padding:4px 10px; border-radius:15px; margin:4px; "
-                                        f"display:inline-block; font-weight:bold; font-size:12px;'>{se}</span>"
-                                    )
-                                st.markdown("".join(badges), unsafe_allow_html=True)
-                            else:
-                                st.info("No side effects found for this drug name.")
+                        if data.get("side_effects"):
+                            st.markdown("---")
+                            st.markdown(f"#### Known Side Effects for: {drug_query}")
+                            
+                            # HTML/CSS badges for improved visual scannability of symptoms
+                            badges = []
+                            for se in data["side_effects"]:
+                                badges.append(
+                                    f"<span style='background-color:#e1f5fe; color:#01579b; "
+                                    f"padding:4px 10px; border-radius:15px; margin:4px; "
+                                    f"display:inline-block; font-weight:bold; font-size:12px;'>{se}</span>"
+                                )
+                            st.markdown("".join(badges), unsafe_allow_html=True)
                         else:
-                            st.error(f"Backend error: {response.status_code}")
+                            st.info("No side effects found for this drug name.")
                             
+                    except requests.exceptions.HTTPError as e:
+                        st.error(f"Backend error: {e.response.status_code}")
                     except requests.exceptions.ConnectionError:
                         st.error("Connection Error: Is the FastAPI backend running?")
             else:
@@ -149,7 +187,7 @@ elif choice == "Report Side Effect":
                 report_data = {"drug_name": drug_input, "symptom": symptom_input}
                 try:
                     # POST request to persist the user report in the database logs
-                    response = requests.post(f"{BASE_URL}/report-side-effect", json=report_data)
+                    response = get_session().post(f"{BASE_URL}/report-side-effect", json=report_data)
                     if response.status_code == 200:
                         st.success(response.json()["message"])
                     else:
@@ -172,6 +210,7 @@ elif choice == "Scientific Analysis":
 
     st.markdown("---")
     
+    session = get_session()
     # Fetching correlation data from the cached function
     scientific_data = fetch_correlation_data()
     
@@ -181,35 +220,37 @@ elif choice == "Scientific Analysis":
         df.columns = ["Protein ID", "Side Effect", "Drug Count"]
         
         st.subheader("Correlation Data Overview")
-        st.dataframe(df, use_container_width=True)
+        st.write("Select a row to reveal the individual drugs involved in the drill down below.")
+        
+        # Row selection replaces a separate pair selectbox; the key keeps the selection across reruns
+        event = st.dataframe(
+            df,
+            use_container_width=True,
+            key="scientific_selection",
+            on_select="rerun",
+            selection_mode="single-row"
+        )
         
         st.markdown("---")
         
         # Subsection: Medication Drill Down for granular data inspection
         st.subheader("Medication Drill Down")
-        st.write("Select a specific Protein and Side Effect to reveal the individual drugs involved:")
         
-        # Creating a stable unique key for selection options
-        df["Selection"] = df["Protein ID"].astype(str) + " | " + df["Side Effect"]
-        selection_options = df["Selection"].tolist()
-        
-        # Using a key parameter to maintain widget state across Streamlit reruns
-        selected_pair = st.selectbox(
-            "Select pair to inspect:", 
-            selection_options, 
-            key="scientific_selection"
-        )
+        # The first pair is inspected until a row is selected
+        selected_row = get_selected_row(event)
         
-        if selected_pair:
-            # Parsing the selection string for API parameters
-            p_id, s_effect = selected_pair.split(" | ")
+        if selected_row < len(df):
+            # Reading the API parameters directly from the selected row
+            p_id, s_effect = df.iloc[selected_row][["Protein ID", "Side Effect"]]
+            p_id = str(p_id)
             
             with st.spinner(f"Fetching specific medications for target {p_id}..."):
                 try:
                     # Drill-down request to fetch individual drug names from the JOIN logic
-                    drug_res = requests.get(
+                    drug_res = session.get(
                         f"{BASE_URL}/science/target-drugs", 
-                        params={"protein_id": p_id, "side_effect": s_effect}
+                        # One extra row tells whether the list continues beyond the displayed page
+                        params={"protein_id": p_id, "side_effect": s_effect, "limit": DRILLDOWN_LIMIT + 1}
                     )
                     
                     if drug_res.status_code == 200:
@@ -217,8 +258,10 @@ elif choice == "Scientific Analysis":
                         st.markdown(f"**Drugs targeting {p_id} that are linked to {s_effect}:**")
                         
                         if drugs:
-                            for drug in drugs:
+                            for drug in drugs[:DRILLDOWN_LIMIT]:
                                 st.markdown(f"- {drug}")
+                            if len(drugs) > DRILLDOWN_LIMIT:
+                                st.caption(f"Showing the first {DRILLDOWN_LIMIT} drugs (alphabetical); further matches exist.")
                         else:
                             st.info("No individual drugs found for this specific target pair.")
                     else:
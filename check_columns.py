@@ -1,7 +1,6 @@
 import pandas as pd
 import requests
 import tarfile
-import io
 
 def inspect_remote_archive(url):
     """
@@ -15,30 +14,27 @@ def inspect_remote_archive(url):
     print(f"Initiating connection to: {url}")
     
     try:
-        # Stream the response to handle large files efficiently
+        # Stream the response so decompression starts before the download completes
         response = requests.get(url, stream=True)
         response.raise_for_status()
+        response.raw.decode_content = True
         
-        # Load the content into an in-memory byte stream
-        file_content = io.BytesIO(response.content)
-        
-        # Open the tarball archive in 'read:gz' mode
-        with tarfile.open(fileobj=file_content, mode="r:gz") as tar:
-            # List all file members contained within the compressed archive
-            members = tar.getnames()
-            print(f"Archive structure identified: {members}")
-            
-            # Access the first member of the archive for schema inspection
-            if not members:
+        # Open the tarball archive in forward-only streaming mode ('r|gz')
+        with response, tarfile.open(fileobj=response.raw, mode="r|gz") as tar:
+            # Access the first data file of the archive for schema inspection
+            first_member = next((m for m in tar if m.isfile()), None)
+            if first_member is None:
                 print("Error: The archive is empty.")
                 return
-                
-            first_file = tar.extractfile(members[0])
+            
+            print(f"Archive member identified: {first_member.name}")
+            first_file = tar.extractfile(first_member)
             
             # Load only a subset of data (first 5 rows) to optimize memory 
             # and processing speed during the inspection phase.
             # 'latin1' encoding is used to handle potential non-UTF8 characters 
             # common in medical datasets.
+            # Leaving the block closes the response, cutting the remaining transfer short.
             df = pd.read_csv(first_file, sep=',', nrows=5, encoding='latin1')
             
             # Output the column names to verify against the SQL import logic
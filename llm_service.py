@@ -1,65 +1,365 @@
 import os
-from openai import OpenAI
+import re
+import asyncio
+import pickle
+import sqlite3
+import hashlib
+import atexit
+import functools
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import closing
+
+import numpy as np
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
+from sentence_transformers import SentenceTransformer
 
 # Load environment variables (API keys) from the .env file
 load_dotenv()
 
+# Cache configuration: exact repeats are served from an in-memory LRU, rephrased
+# queries from an embedding-based semantic cache persisted between restarts
+EXACT_CACHE_SIZE = 1024
+SEMANTIC_CACHE_THRESHOLD = 0.92
+SEMANTIC_CACHE_SIZE = 4096
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", "semantic_cache.pkl")
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Deterministic sampling makes the completion a function of the prompt, so identical
+# prompts can be answered from a persistent response cache keyed by model and seed
+LLM_MODEL = "gpt-4o"
+LLM_SEED = 42
+TERMS_PER_INPUT = 3
+# Output budget per numbered answer line ("12. term, term, term"), which caps generation
+# if the model ignores the requested format and keeps writing
+MAX_TOKENS_PER_INPUT = 32
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "llm_responses.sqlite3")
+
+# Matches one answer line of a batched response, e.g. "2. Nausea, Vomiting, Dizziness"
+_NUMBERED_LINE = re.compile(r"^\s*(\d+)[.)]\s*(.*)$")
+
+# Controlled vocabulary (side-effect names from the database), keyed by normalized lowercase name
+_controlled_vocabulary = {}
+
+_exact_cache = OrderedDict()
+_semantic_embeddings = None
+_semantic_terms = []
+_semantic_next = 0
+_semantic_dirty = False
+_cache_lock = threading.Lock()
+_persist_lock = threading.Lock()
+
+@functools.cache
 def get_openai_client():
     """
-    Helper function: Initializes the OpenAI client instance.
-    The client is created on-demand to ensure resources are only allocated when needed.
+    Helper function: Initializes the asynchronous OpenAI client instance.
+    The client is created on first use and then reused, so its HTTP connection pool
+    (and the TLS session to the API) stays warm across requests.
     Verifies the existence of the API key to prevent runtime crashes.
     """
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise ValueError("OPENAI_API_KEY is missing in the local .env configuration!")
-    return OpenAI(api_key=api_key)
+    return AsyncOpenAI(api_key=api_key)
+
+def load_controlled_vocabulary(terms):
+    """
+    Registers the SIDER/SNAP side-effect names used by the database.
+    Inputs that already are one of these terms are answered locally without an LLM call.
+    """
+    global _controlled_vocabulary
+    _controlled_vocabulary = {" ".join(term.lower().split()): term for term in terms}
+
+@functools.cache
+def get_embedding_model():
+    """
+    Loads the Sentence-BERT model once per process.
+    The model is only loaded on the first cache lookup, not at import time.
+    """
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+def embed_text(text: str):
+    """Encodes text into a unit-length embedding, so a dot product equals cosine similarity."""
+    return get_embedding_model().encode(text, normalize_embeddings=True)
+
+def _load_semantic_cache():
+    """Restores previously stored (embedding, terms) pairs from disk, if available."""
+    global _semantic_embeddings, _semantic_terms, _semantic_next
+    if not os.path.exists(SEMANTIC_CACHE_PATH):
+        return
+    try:
+        with open(SEMANTIC_CACHE_PATH, "rb") as f:
+            embeddings, terms = pickle.load(f)
+        embeddings, terms = embeddings[-SEMANTIC_CACHE_SIZE:], list(terms)[-SEMANTIC_CACHE_SIZE:]
+        if len(terms):
+            _semantic_embeddings = np.zeros((SEMANTIC_CACHE_SIZE, embeddings.shape[1]), dtype=embeddings.dtype)
+            _semantic_embeddings[:len(terms)] = embeddings
+            _semantic_terms = terms
+            _semantic_next = len(terms) % SEMANTIC_CACHE_SIZE
+    except Exception as e:
+        print(f"Semantic cache could not be loaded: {e}")
 
-def translate_symptoms_to_medical_terms(user_input: str):
+def _lookup_exact(cache_key: str):
+    with _cache_lock:
+        terms = _exact_cache.get(cache_key)
+        if terms is not None:
+            _exact_cache.move_to_end(cache_key)
+        return terms
+
+def _store_exact(cache_key: str, terms):
+    with _cache_lock:
+        _exact_cache[cache_key] = tuple(terms)
+        _exact_cache.move_to_end(cache_key)
+        if len(_exact_cache) > EXACT_CACHE_SIZE:
+            _exact_cache.popitem(last=False)
+
+def _lookup_semantic(embedding):
+    """Returns the cached terms of the most similar prior query if it exceeds the threshold."""
+    with _cache_lock:
+        count = len(_semantic_terms)
+        if _semantic_embeddings is None or not count:
+            return None
+        similarities = _semantic_embeddings[:count] @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] >= SEMANTIC_CACHE_THRESHOLD:
+            return _semantic_terms[best]
+        return None
+
+def _store_semantic(embedding, terms):
+    """
+    Adds a new (embedding, terms) pair to a preallocated ring buffer of SEMANTIC_CACHE_SIZE rows,
+    overwriting the oldest entry once it is full. Only memory is touched here; the cache is
+    written to disk by persist_semantic_cache().
+    """
+    global _semantic_embeddings, _semantic_next, _semantic_dirty
+    with _cache_lock:
+        if _semantic_embeddings is None:
+            _semantic_embeddings = np.zeros((SEMANTIC_CACHE_SIZE, embedding.shape[0]), dtype=embedding.dtype)
+        _semantic_embeddings[_semantic_next] = embedding
+        if len(_semantic_terms) < SEMANTIC_CACHE_SIZE:
+            _semantic_terms.append(tuple(terms))
+        else:
+            _semantic_terms[_semantic_next] = tuple(terms)
+        _semantic_next = (_semantic_next + 1) % SEMANTIC_CACHE_SIZE
+        _semantic_dirty = True
+
+def persist_semantic_cache():
+    """
+    Writes the semantic cache to disk if it changed since the last write (called on a timer
+    and at exit). Only the snapshot copy holds _cache_lock; the file is written to a temp file
+    and swapped in atomically, so a crash mid-write never leaves a truncated pickle behind.
+    """
+    global _semantic_dirty
+    with _persist_lock:
+        with _cache_lock:
+            if not _semantic_dirty:
+                return
+            count = len(_semantic_terms)
+            # Oldest entry first, so a reload keeps the same eviction order
+            order = np.roll(np.arange(count), -_semantic_next) if count == SEMANTIC_CACHE_SIZE else np.arange(count)
+            snapshot = (_semantic_embeddings[order], [_semantic_terms[i] for i in order])
+            _semantic_dirty = False
+        try:
+            directory = os.path.dirname(os.path.abspath(SEMANTIC_CACHE_PATH))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(snapshot, f)
+                os.replace(tmp_path, SEMANTIC_CACHE_PATH)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            with _cache_lock:
+                _semantic_dirty = True
+            print(f"Semantic cache could not be persisted: {e}")
+
+def _response_cache_connection():
+    """
+    Opens the SQLite response cache. SQLite locks the file itself, so several uvicorn
+    worker processes can share it; WAL mode lets readers proceed during a write.
+    """
+    conn = sqlite3.connect(RESPONSE_CACHE_PATH, timeout=5)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS responses (cache_key TEXT PRIMARY KEY, content TEXT NOT NULL)")
+    return conn
+
+def _read_response_cache(cache_key: str):
+    with closing(_response_cache_connection()) as conn:
+        row = conn.execute("SELECT content FROM responses WHERE cache_key = ?", (cache_key,)).fetchone()
+    return row[0] if row else None
+
+def _write_response_cache(cache_key: str, content: str):
+    with closing(_response_cache_connection()) as conn, conn:
+        conn.execute("INSERT OR REPLACE INTO responses (cache_key, content) VALUES (?, ?)", (cache_key, content))
+
+def _drop_unfinished_tail(content: str):
+    """Cuts a truncated answer back to its last complete line, or to its last complete term."""
+    if "\n" in content:
+        return content.rsplit("\n", 1)[0]
+    return content.rsplit(",", 1)[0] if "," in content else ""
+
+async def _cached_completion(client, prompt: str, expected_lines: int):
+    """
+    Returns the model output for a prompt, reusing a stored response when available.
+    Responses are persisted in a SQLite table under sha256(model, seed, prompt).
+    Cache errors are logged and never replace the LLM answer.
+    """
+    cache_key = hashlib.sha256(f"{LLM_MODEL}:{LLM_SEED}:{prompt}".encode()).hexdigest()
+    try:
+        content = await asyncio.to_thread(_read_response_cache, cache_key)
+    except sqlite3.Error as e:
+        print(f"Response cache unavailable: {e}")
+        content = None
+    if content is not None:
+        return content
+
+    # API Call: GPT-4o is used for high semantic accuracy.
+    # Temperature 0 with a fixed seed makes outputs reproducible across runs.
+    # Awaiting the request frees the event loop for other requests during the LLM latency.
+    response = await client.chat.completions.create(
+        model=LLM_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0,
+        seed=LLM_SEED,
+        max_tokens=MAX_TOKENS_PER_INPUT * expected_lines
+    )
+    content = response.choices[0].message.content or ""
+
+    # A reply cut off by the token cap ends in a half-written term or line: that unfinished
+    # tail is dropped, and the truncated answer is not cached so a later call can retry
+    if response.choices[0].finish_reason == "length":
+        return _drop_unfinished_tail(content)
+
+    try:
+        await asyncio.to_thread(_write_response_cache, cache_key, content)
+    except sqlite3.Error as e:
+        print(f"Response could not be cached: {e}")
+    return content
+
+def _split_terms(line: str):
+    """Splits one comma-separated answer into at most TERMS_PER_INPUT clean terms."""
+    terms = [term.strip() for term in line.split(",") if term.strip()]
+    return terms[:TERMS_PER_INPUT]
+
+async def _request_medical_terms_batch(inputs: list[str]):
+    """
+    Sends all symptom descriptions to GPT-4o in one numbered prompt and parses one term list per input.
+    The static instructions come first, so the shared prompt prefix is paid once per batch.
+    """
+    # Obtain the authenticated OpenAI client
+    client = get_openai_client()
+
+    numbered_inputs = "\n".join(f'{i}. "{text}"' for i, text in enumerate(inputs, start=1))
+
+    # PROMPT ENGINEERING:
+    # The prompt defines a structured reasoning process for the LLM:
+    # 1. Language Detection (Multilingual support)
+    # 2. Semantic Analysis (Understanding the intent)
+    # 3. Domain Mapping (Alignment with clinical terminology)
+    prompt = f"""
+    You are a multilingual medical assistant. Users describe symptoms in their native language.
+
+    For each numbered description below:
+    1. Detect the language and understand the symptoms.
+    2. Map these symptoms to the 3 most likely medical side-effect terms used in English databases like SIDER or SNAP.
+    3. Translate your findings into standard English medical terminology.
+
+    Respond ONLY with one line per description in the form "<number>. term1, term2, term3". No explanations.
+    Example: 1. "Kopfschmerzen" -> Output: 1. Headache, Migraine, Cephalalgia
+
+    Descriptions:
+    {numbered_inputs}
+    """
+
+    raw_content = await _cached_completion(client, prompt, len(inputs))
+
+    # Post-processing: Each "<number>. a, b, c" line is split into a Python list
+    results = [[] for _ in inputs]
+    for line in raw_content.splitlines():
+        match = _NUMBERED_LINE.match(line)
+        if not match:
+            continue
+        index = int(match.group(1)) - 1
+        if 0 <= index < len(inputs):
+            # Clean up whitespace for database compatibility
+            results[index] = _split_terms(match.group(2))
+
+    # A single answer may come back without its number prefix
+    if len(inputs) == 1 and not results[0]:
+        results[0] = _split_terms(raw_content)
+    return results
+
+async def translate_symptoms_batch(inputs: list[str], embeddings: list = None) -> list[list[str]]:
     """
     Performs semantic mapping of natural language symptoms into controlled medical vocabulary.
-    
-    This function utilizes Large Language Models (LLM) to bridge the gap between 
-    informal patient descriptions and the formal English medical nomenclature 
+
+    This function utilizes Large Language Models (LLM) to bridge the gap between
+    informal patient descriptions and the formal English medical nomenclature
     found in clinical databases like SIDER, STITCH, or SNAP.
+    Inputs already answered (identically or in close rephrasing) are served from cache;
+    all remaining inputs are translated together in a single API call.
+    Callers that already encoded the inputs pass the vectors as embeddings to avoid a second encoding.
     """
+    results = [None] * len(inputs)
+    pending = []
+
+    for i, user_input in enumerate(inputs):
+        cache_key = " ".join(user_input.lower().split())
+
+        # Short-circuit: The input already is a controlled English medical term
+        canonical_term = _controlled_vocabulary.get(cache_key)
+        if canonical_term is not None:
+            results[i] = [canonical_term]
+            continue
+
+        # Tier 1: Exact match on the whitespace/case-normalized input
+        cached = _lookup_exact(cache_key)
+        if cached is not None:
+            results[i] = list(cached)
+            continue
+
+        # Tier 2: Nearest prior query by cosine similarity of the sentence embeddings
+        # (encoding is CPU-bound and runs in a worker thread to keep the event loop responsive)
+        try:
+            embedding = embeddings[i] if embeddings is not None else None
+            if embedding is None:
+                embedding = await asyncio.to_thread(embed_text, user_input)
+            cached = _lookup_semantic(embedding)
+        except Exception as e:
+            print(f"Semantic cache unavailable: {e}")
+            embedding, cached = None, None
+        if cached is not None:
+            _store_exact(cache_key, cached)
+            results[i] = list(cached)
+            continue
+
+        pending.append((i, cache_key, embedding))
+
+    if not pending:
+        return results
+
     try:
-        # Obtain the authenticated OpenAI client
-        client = get_openai_client()
-        
-        # PROMPT ENGINEERING: 
-        # The prompt defines a structured reasoning process for the LLM:
-        # 1. Language Detection (Multilingual support)
-        # 2. Semantic Analysis (Understanding the intent)
-        # 3. Domain Mapping (Alignment with clinical terminology)
-        prompt = f"""
-        You are a multilingual medical assistant. A user describes symptoms in their native language: "{user_input}"
-        
-        1. Detect the language and understand the symptoms.
-        2. Map these symptoms to the 3 most likely medical side-effect terms used in English databases like SIDER or SNAP.
-        3. Translate your findings into standard English medical terminology.
-        
-        Respond ONLY with the English terms, separated by commas. No explanations.
-        Example: "Kopfschmerzen" -> Output: Headache, Migraine, Cephalalgia
-        """
-
-        # API Call: GPT-4o is used for high semantic accuracy.
-        # Temperature is set to 0.2 to ensure deterministic and consistent outputs.
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2
-        )
-        
-        # Post-processing: Parsing the comma-separated string into a Python list
-        raw_content = response.choices[0].message.content
-        terms = raw_content.split(",")
-        
-        # Clean up whitespace for database compatibility
-        return [term.strip() for term in terms]
-    
+        answers = await _request_medical_terms_batch([inputs[i] for i, _, _ in pending])
     except Exception as e:
         # Error handling for network issues or API authentication failures
         print(f"Internal LLM Service Error: {e}")
-        return []
\ No newline at end of file
+        answers = [[] for _ in pending]
+
+    for (i, cache_key, embedding), terms in zip(pending, answers):
+        results[i] = terms
+        # Failed or empty answers are not cached, so the next request retries the API
+        if terms:
+            _store_exact(cache_key, terms)
+            if embedding is not None:
+                await asyncio.to_thread(_store_semantic, embedding, terms)
+    return results
+
+async def translate_symptoms_to_medical_terms(user_input: str, embedding=None):
+    """Single-input wrapper around translate_symptoms_batch, kept for existing callers."""
+    return (await translate_symptoms_batch([user_input], [embedding]))[0]
+
+_load_semantic_cache()
+atexit.register(persist_semantic_cache)
@@ -5,7 +5,9 @@
 -- 1. Create Main Catalog Tables
 CREATE TABLE IF NOT EXISTS drugs (
     stitch_id VARCHAR(50) PRIMARY KEY,
-    common_name TEXT NOT NULL
+    common_name TEXT NOT NULL,
+    -- Quote-stripped display name, computed once at ingest instead of per query
+    common_name_clean TEXT GENERATED ALWAYS AS (TRIM(BOTH '''' FROM common_name)) STORED
 );
 
 CREATE TABLE IF NOT EXISTS side_effects (
@@ -43,7 +45,21 @@ CREATE INDEX IF NOT EXISTS idx_drug_se_code ON drug_side_effects(se_code);
 CREATE INDEX IF NOT EXISTS idx_drug_targets_drug_id ON drug_targets(drug_id);
 CREATE INDEX IF NOT EXISTS idx_drug_targets_protein_id ON drug_targets(protein_id);
 
--- 5. Scientific Analysis Module (Materialized View)
+-- 5. Text Search Optimization (Trigram GIN Indexes)
+-- Leading-wildcard ILIKE '%term%' lookups cannot use B-trees; trigram indexes serve them directly.
+-- On a live database, add CONCURRENTLY to build the indexes without blocking writes.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_se_name_trgm ON side_effects USING gin (se_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_drugs_common_name_trgm ON drugs USING gin (common_name gin_trgm_ops);
+-- Adds the quote-trimmed generated column to databases created before it was part of the table definition
+ALTER TABLE drugs ADD COLUMN IF NOT EXISTS common_name_clean TEXT GENERATED ALWAYS AS (TRIM(BOTH '''' FROM common_name)) STORED;
+-- Index on the quote-trimmed generated column used by the report validation
+CREATE INDEX IF NOT EXISTS idx_drugs_name_clean_trgm ON drugs USING gin (common_name_clean gin_trgm_ops);
+-- Anchored prefix searches (lower(name) LIKE 'term%') use a B-tree range scan; text_pattern_ops
+-- makes the index usable for LIKE regardless of the database collation
+CREATE INDEX IF NOT EXISTS idx_drugs_name_clean_prefix ON drugs (lower(common_name_clean) text_pattern_ops);
+
+-- 6. Scientific Analysis Module (Materialized View)
 -- Precomputed aggregation of protein targets and their shared side effects
 CREATE MATERIALIZED VIEW IF NOT EXISTS mv_target_correlations AS
 SELECT 
@@ -57,5 +73,24 @@ JOIN side_effects se ON dse.se_code = se.se_code
 GROUP BY dt.protein_id, se.se_name
 HAVING COUNT(DISTINCT d.stitch_id) > 1;
 
--- Refresh command (to be called after data import)
--- REFRESH MATERIALIZED VIEW mv_target_correlations;
\ No newline at end of file
+-- Unique index required by REFRESH ... CONCURRENTLY (reads are not blocked during refresh)
+CREATE UNIQUE INDEX IF NOT EXISTS mv_target_corr_pk ON mv_target_correlations (protein_id, se_name);
+
+-- Refresh command (to be called after data import; the backend also refreshes every 15 minutes)
+-- REFRESH MATERIALIZED VIEW CONCURRENTLY mv_target_correlations;
+
+-- 7. Semantic Query Cache (pgvector)
+-- Stores answered symptom queries with their sentence embedding, so paraphrased
+-- queries are served without another LLM call; entries expire after 7 days
+CREATE EXTENSION IF NOT EXISTS vector;
+
+CREATE TABLE IF NOT EXISTS query_cache (
+    id SERIAL PRIMARY KEY,
+    query TEXT NOT NULL,
+    embedding VECTOR(384) NOT NULL, -- all-MiniLM-L6-v2 dimension
+    medical_terms JSONB NOT NULL,
+    results JSONB NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_query_cache_embedding ON query_cache USING hnsw (embedding vector_cosine_ops);